@@ -1,22 +1,30 @@
 from __future__ import annotations
 
 import asyncio
+import importlib
 import inspect
 import logging
 import os
 import time
 from dataclasses import dataclass, field
-from typing import Any, Callable, Awaitable, Literal, Optional
+from typing import TYPE_CHECKING, Any, Callable, Awaitable, Literal, Optional
 from uuid import uuid4
 
-from browser_use import Agent, BrowserSession
-from browser_use.agent.views import ActionResult
-from browser_use.tools.service import Tools
-from gitlab_duo_complete import create_duo_models
-
-from veto import Veto, VetoOptions
-from veto.types.tool import ToolCall
-from veto.utils.id import generate_tool_call_id
+from routing import MODEL_ROUTING, ModelRouter
+from tracing import (
+    NULL_TRACER,
+    NullTracer,
+    Tracer,
+    create_tracer,
+    maybe_start_profiler,
+    trace_method,
+)
+from validation import ResilientValidator
+
+if TYPE_CHECKING:
+    from browser_use import Agent
+    from browser_use.tools.service import Tools
+    from veto import Veto
 
 logger = logging.getLogger("demo.agent")
 
@@ -34,6 +42,28 @@ APPROVAL_TIMEOUT = 300
 
 EmitFn = Callable[[str, dict[str, Any]], Awaitable[None]]
 
+# browser_use, veto and the LLM clients are imported inside run_agent and
+# _build_demo_tools so that importing this module (and main.py) stays cheap.
+# These are the modules those imports actually load: browser_use's package
+# __init__ resolves Agent/BrowserSession lazily, so the top-level package
+# alone isn't enough. bench_startup.py checks main.py doesn't load them.
+LAZY_IMPORTS = (
+    "browser_use.agent.service",
+    "browser_use.agent.views",
+    "browser_use.browser.session",
+    "browser_use.tools.service",
+    "veto",
+    "veto.types.tool",
+    "veto.utils.id",
+    "gitlab_duo_complete",
+)
+
+
+def preload() -> None:
+    """Import LAZY_IMPORTS ahead of the first session."""
+    for name in LAZY_IMPORTS:
+        importlib.import_module(name)
+
 
 @dataclass
 class AgentSession:
@@ -49,12 +79,32 @@ class AgentSession:
     pending_approvals: dict[str, dict[str, Any]] = field(default_factory=dict)
     demo_policy_ids: list[str] = field(default_factory=list)
     stopped: bool = False
+    tracer: Tracer | NullTracer = NULL_TRACER
+
+
+# One validator per (Veto backend, API key) for the whole process, so the
+# circuit breaker, latency window and metrics carry over between sessions of
+# the same visitor without one visitor's failures tripping another's breaker.
+_validators: dict[tuple[str, str], ResilientValidator] = {}
+
+
+def _get_validator(base_url: str, api_key: str) -> ResilientValidator:
+    key = (base_url.rstrip("/"), api_key)
+    if key not in _validators:
+        _validators[key] = ResilientValidator()
+    return _validators[key]
 
 
 def _build_demo_tools(
     veto_instance: Veto,
     session: AgentSession,
+    validator: ResilientValidator,
 ) -> type[Tools]:
+    from browser_use.agent.views import ActionResult
+    from browser_use.tools.service import Tools
+    from veto.types.tool import ToolCall
+    from veto.utils.id import generate_tool_call_id
+
     class DemoVetoTools(Tools):  # type: ignore[misc]
         async def act(
             self,
@@ -66,20 +116,49 @@ def _build_demo_tools(
             action_name = next(iter(action_dict), None)
             params = action_dict.get(action_name, {}) if action_name else {}
 
+            with session.tracer.span("tools.act", action=action_name):
+                return await self._validated_act(
+                    action, action_name, params, browser_session, **kwargs
+                )
+
+        async def _validated_act(
+            self,
+            action: Any,
+            action_name: Optional[str],
+            params: Any,
+            browser_session: Any,
+            **kwargs: Any,
+        ) -> Any:
+            tracer = session.tracer
+
             if action_name and action_name in VALIDATED_ACTIONS:
                 arguments = params if isinstance(params, dict) else {"value": params}
                 emit = session.emit
 
+                # Built once so a hedged request is the same tool call (same
+                # id) to Veto rather than a second decision.
+                tool_call = ToolCall(
+                    id=generate_tool_call_id(),
+                    name=action_name,
+                    arguments=arguments,
+                )
+
                 start = time.perf_counter()
                 try:
-                    result = await veto_instance._validate_tool_call(
-                        ToolCall(
-                            id=generate_tool_call_id(),
-                            name=action_name,
-                            arguments=arguments,
+                    with tracer.span("veto.validate") as validate_span:
+                        outcome = await validator.validate(
+                            action_name,
+                            lambda: veto_instance._validate_tool_call(tool_call),
+                        )
+                        result = outcome.result
+                        validate_span.set(
+                            allowed=result.allowed,
+                            hedged=outcome.hedged,
+                            fallback=outcome.fallback,
                         )
-                    )
                     latency_ms = round((time.perf_counter() - start) * 1000)
+                    if emit:
+                        await emit("validator_metrics", validator.metrics())
 
                     if result.allowed:
                         if emit:
@@ -132,9 +211,10 @@ def _build_demo_tools(
                             )
 
                         try:
-                            await asyncio.wait_for(
-                                approval_event.wait(), timeout=APPROVAL_TIMEOUT
-                            )
+                            with tracer.span("approval.wait"):
+                                await asyncio.wait_for(
+                                    approval_event.wait(), timeout=APPROVAL_TIMEOUT
+                                )
                         except asyncio.TimeoutError:
                             session.pending_approvals.pop(approval_id, None)
                             return ActionResult(
@@ -146,7 +226,10 @@ def _build_demo_tools(
                         ).get("result")
 
                         if user_decision == "approve":
-                            return await super().act(action, browser_session, **kwargs)
+                            with tracer.span("browser.action"):
+                                return await super().act(
+                                    action, browser_session, **kwargs
+                                )
                         else:
                             return ActionResult(error="Denied by reviewer")
 
@@ -154,7 +237,8 @@ def _build_demo_tools(
                     logger.error("Veto validation error for %s: %s", action_name, e)
                     return ActionResult(error=f"Veto validation error: {e}")
 
-            return await super().act(action, browser_session, **kwargs)
+            with tracer.span("browser.action"):
+                return await super().act(action, browser_session, **kwargs)
 
     return DemoVetoTools
 
@@ -167,53 +251,154 @@ def _truncate_args(args: dict[str, Any], max_len: int = 200) -> dict[str, Any]:
     return out
 
 
+def _step_signals(agent_instance: Any) -> tuple[list[str], bool]:
+    """Return (action names, had_error) for the agent's last step."""
+    history = getattr(getattr(agent_instance, "history", None), "history", None)
+    if not history:
+        return [], False
+    last = history[-1]
+
+    actions: list[str] = []
+    model_output = getattr(last, "model_output", None)
+    for action in getattr(model_output, "action", None) or []:
+        try:
+            action_name = next(iter(action.model_dump(exclude_unset=True)), None)
+        except Exception:
+            action_name = None
+        if action_name:
+            actions.append(action_name)
+
+    results = getattr(last, "result", None) or []
+    had_error = model_output is None or any(
+        getattr(r, "error", None) for r in results
+    )
+    return actions, had_error
+
+
+async def _current_url(agent_instance: Any) -> Optional[str]:
+    """URL after the step ran. The history item's state.url is the page the
+    step *started* on, so it lags a navigation by one step."""
+    browser_session = getattr(agent_instance, "browser_session", None)
+    get_url = getattr(browser_session, "get_current_page_url", None)
+    if get_url is None:
+        return None
+    try:
+        return await get_url()
+    except Exception:
+        return None
+
+
 async def run_agent(session: AgentSession) -> None:
     emit = session.emit
     if not emit:
         raise RuntimeError("session.emit must be set before calling run_agent")
 
+    from browser_use import Agent, BrowserSession
+    from gitlab_duo_complete import HISTORY_STRATEGY, HISTORY_WINDOW, create_duo_models
+    from veto import Veto, VetoOptions
+
+    tracer = create_tracer(emit)
+    session.tracer = tracer
+    run_span = tracer.begin("agent.run", model=session.llm_model)
+
     await emit("status", {"step": 0, "maxSteps": MAX_STEPS, "state": "initializing"})
 
-    veto_instance = await Veto.init(
-        VetoOptions(
-            api_key=session.veto_api_key,
-            base_url=session.veto_base_url,
+    with tracer.span("veto.init"):
+        veto_instance = await Veto.init(
+            VetoOptions(
+                api_key=session.veto_api_key,
+                base_url=session.veto_base_url,
+            )
         )
-    )
 
-    DemoTools = _build_demo_tools(veto_instance, session)
+    DemoTools = _build_demo_tools(
+        veto_instance, session, _get_validator(session.veto_base_url, session.veto_api_key)
+    )
 
-    duo_models = create_duo_models(session.model_provider_token)
-    llm = (
-        duo_models["claude_opus"]
-        if session.llm_model == "claude-opus-4.5"
-        else duo_models["claude_sonnet"]
+    with tracer.span("models.create"):
+        duo_models = create_duo_models(session.model_provider_token)
+    ceiling = (
+        "claude_opus" if session.llm_model == "claude-opus-4.5" else "claude_sonnet"
     )
+    router = ModelRouter(duo_models, ceiling) if MODEL_ROUTING == "adaptive" else None
+    llm = router if router else duo_models[ceiling]
 
     # Run browser VISIBLE on the Xvfb virtual display.
     # The user watches via VNC — no screenshot streaming needed.
     display = os.environ.get("DISPLAY", ":99")
     logger.info("Launching visible browser on display %s", display)
     browser_session = BrowserSession(headless=False)
+    if isinstance(tracer, Tracer):
+        # DOM extraction + screenshot for each step's LLM input.
+        trace_method(
+            browser_session, "get_browser_state_summary", tracer, "browser.state"
+        )
     step_counter = {"n": 0}
 
+    async def on_usage(usage: dict[str, Any]) -> None:
+        await emit("usage", {"step": step_counter["n"] + 1, **usage})
+
+    for model in router.models() if router else [llm]:
+        if hasattr(model, "on_usage"):
+            model.on_usage = on_usage
+        if hasattr(model, "tracer"):
+            model.tracer = tracer
+
+    step_span: dict[str, Any] = {"span": None, "start": None}
+    profiler = maybe_start_profiler(session.id)
+
+    async def on_step_start(agent_instance: Agent):
+        step_span["start"] = time.perf_counter()
+        step_span["span"] = tracer.begin("step", step=step_counter["n"] + 1)
+
     async def on_step_end(agent_instance: Agent):
         step_counter["n"] += 1
         step = step_counter["n"]
-        await emit("status", {"step": step, "maxSteps": MAX_STEPS, "state": "running"})
+        with tracer.span("on_step_end"):
+            await emit(
+                "status", {"step": step, "maxSteps": MAX_STEPS, "state": "running"}
+            )
+        if router:
+            actions, had_error = _step_signals(agent_instance)
+            step_ms = (
+                (time.perf_counter() - step_span["start"]) * 1000
+                if step_span["start"] is not None
+                else None
+            )
+            await emit(
+                "routing",
+                router.observe_step(
+                    actions, had_error, await _current_url(agent_instance), step_ms
+                ),
+            )
+        tracer.end(step_span["span"])
+        step_span["span"] = None
+        await tracer.flush(step=step)
 
     try:
+        agent_kwargs: dict[str, Any] = {}
+        agent_params = inspect.signature(Agent).parameters
+        if HISTORY_STRATEGY == "window" and "max_history_items" in agent_params:
+            agent_kwargs["max_history_items"] = HISTORY_WINDOW
+        if router and "page_extraction_llm" in agent_params:
+            # Keep extract-action LLM calls on the selected model and out of
+            # the router's per-step accounting.
+            agent_kwargs["page_extraction_llm"] = duo_models[ceiling]
+
         agent = Agent(
             task=session.task,
             llm=llm,
             browser_session=browser_session,
             tools=DemoTools(),
+            **agent_kwargs,
         )
 
         await emit("status", {"step": 0, "maxSteps": MAX_STEPS, "state": "running"})
 
         run_kwargs: dict[str, Any] = {"max_steps": MAX_STEPS}
         sig = inspect.signature(agent.run)
+        if "on_step_start" in sig.parameters and (tracer.enabled or router):
+            run_kwargs["on_step_start"] = on_step_start
         if "on_step_end" in sig.parameters:
             run_kwargs["on_step_end"] = on_step_end
 
@@ -232,3 +417,7 @@ async def run_agent(session: AgentSession) -> None:
             await browser_session.close()
         except Exception:
             pass
+        tracer.end(run_span)
+        await tracer.flush(step=step_counter["n"])
+        if profiler:
+            await asyncio.to_thread(profiler.stop)
@@ -0,0 +1,74 @@
+"""Startup benchmark: time `import main` in fresh interpreters against a budget.
+
+Exits non-zero if the median import time exceeds STARTUP_IMPORT_BUDGET_MS or
+if any lazily-loaded module was imported eagerly. Run from backend/. With
+`--imports-only` only the eager-import check runs, which is deterministic and
+safe to run inside the image build.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from agent import LAZY_IMPORTS
+
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1000"))
+RUNS = int(os.getenv("STARTUP_BENCH_RUNS", "5"))
+# Modules main.py must not import at load time.
+LAZY_MODULES = (
+    *LAZY_IMPORTS,
+    "browser_use",
+    "playwright",
+    "requests",
+    "aiohttp",
+    "policies",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"ms": elapsed_ms, "eager": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _measure() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE % (list(LAZY_MODULES),)],
+        cwd=Path(__file__).parent,
+        env={**os.environ, "WARMUP_ON_START": "0"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    imports_only = "--imports-only" in sys.argv[1:]
+    samples = [_measure() for _ in range(1 if imports_only else RUNS)]
+    median_ms = statistics.median(s["ms"] for s in samples)
+    eager = sorted({m for s in samples for m in s["eager"]})
+
+    ok = True
+    if imports_only:
+        print(f"import main: {median_ms:.0f}ms (budget not enforced)")
+    else:
+        print(f"import main: median {median_ms:.0f}ms over {RUNS} runs (budget {STARTUP_IMPORT_BUDGET_MS:.0f}ms)")
+    if not imports_only and median_ms > STARTUP_IMPORT_BUDGET_MS:
+        print("FAIL: import time over budget")
+        ok = False
+    if eager:
+        print(f"FAIL: eagerly imported: {', '.join(eager)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,66 @@
 from __future__ import annotations
 
-from typing import Any
+import logging
+import os
+from typing import Any, Awaitable, Callable, Optional
 
 import requests
 from browser_use.llm.anthropic.chat import ChatAnthropic as BrowserChatAnthropic
 from browser_use.llm.openai.chat import ChatOpenAI as BrowserChatOpenAI
+from tracing import NULL_TRACER, NullTracer, Tracer
 
 ANTHROPIC_PROXY_URL = "https://cloud.gitlab.com/ai/v1/proxy/anthropic"
 OPENAI_PROXY_URL = "https://cloud.gitlab.com/ai/v1/proxy/openai/v1"
 
+# "window" caps the agent history inlined into each step's prompt at
+# HISTORY_WINDOW items (browser-use's max_history_items); "full" keeps it all.
+HISTORY_STRATEGY = os.getenv("HISTORY_STRATEGY", "window")
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))
+
+logger = logging.getLogger("demo.gitlab_duo")
+
+UsageFn = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class InstrumentedChatAnthropic(BrowserChatAnthropic):
+    """ChatAnthropic that reports token usage and traces each call.
+
+    browser-use already marks the system prompt and tool schema as cache
+    breakpoints; the per-step state message changes every step, so nothing
+    else is worth caching. Per-call usage, including cached vs. uncached
+    prompt tokens, goes to `on_usage` when set, and each call is recorded as
+    an `llm.invoke` span on `tracer`.
+    """
+
+    on_usage: Optional[UsageFn] = None
+    tracer: Tracer | NullTracer = NULL_TRACER
+
+    async def ainvoke(self, messages: list[Any], *args: Any, **kwargs: Any) -> Any:
+        with self.tracer.span("llm.invoke", model=str(self.model)):
+            completion = await super().ainvoke(messages, *args, **kwargs)
+        if self.on_usage is not None:
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                try:
+                    await self.on_usage(_usage_summary(str(self.model), usage))
+                except Exception as e:
+                    logger.warning("Failed to report token usage: %s", e)
+        return completion
+
+
+def _usage_summary(model: str, usage: Any) -> dict[str, Any]:
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    cached = getattr(usage, "prompt_cached_tokens", 0) or 0
+    cache_write = getattr(usage, "prompt_cache_creation_tokens", 0) or 0
+    return {
+        "model": model,
+        "promptTokens": prompt,
+        "cachedTokens": cached,
+        "cacheWriteTokens": cache_write,
+        "uncachedTokens": max(prompt - cached, 0),
+        "completionTokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
 
 def _get_gitlab_token(api_key: str) -> dict[str, Any]:
     response = requests.post(
@@ -42,7 +94,7 @@ def _create_models(
         k: v for k, v in gitlab_headers.items() if k.lower() != "authorization"
     }
 
-    claude_opus = BrowserChatAnthropic(
+    claude_opus = InstrumentedChatAnthropic(
         model="claude-opus-4-5-20251101",
         api_key="unused",
         base_url=ANTHROPIC_PROXY_URL,
@@ -51,7 +103,7 @@ def _create_models(
         timeout=30.0,
     )
 
-    claude_sonnet = BrowserChatAnthropic(
+    claude_sonnet = InstrumentedChatAnthropic(
         model="claude-sonnet-4-5-20250929",
         api_key="unused",
         base_url=ANTHROPIC_PROXY_URL,
@@ -60,7 +112,7 @@ def _create_models(
         timeout=30.0,
     )
 
-    claude_haiku = BrowserChatAnthropic(
+    claude_haiku = InstrumentedChatAnthropic(
         model="claude-haiku-4-5-20251001",
         api_key="unused",
         base_url=ANTHROPIC_PROXY_URL,
@@ -3,7 +3,9 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import time
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Literal
 
@@ -12,13 +14,45 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from agent import AgentSession, run_agent
-from policies import ensure_demo_policies, cleanup_demo_policies
+from agent import AgentSession, preload, run_agent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("demo.main")
 
-app = FastAPI(title="Veto Browser Agent Demo")
+# Import the heavy agent dependencies in the background once the server is up,
+# so /api/health answers immediately and the first session doesn't pay for them.
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "1") == "1"
+
+_warm = False
+
+
+def warm_imports() -> float:
+    """Import the lazily-loaded modules. Returns elapsed milliseconds."""
+    global _warm
+    start = time.perf_counter()
+    preload()
+    import policies
+    _warm = True
+    return (time.perf_counter() - start) * 1000
+
+
+async def _warm_up() -> None:
+    try:
+        elapsed_ms = await asyncio.to_thread(warm_imports)
+        logger.info("Warm-up imports finished in %.0fms", elapsed_ms)
+    except Exception:
+        logger.exception("Warm-up imports failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = asyncio.create_task(_warm_up()) if WARMUP_ON_START and not _warm else None
+    yield
+    if warmup and not warmup.done():
+        warmup.cancel()
+
+
+app = FastAPI(title="Veto Browser Agent Demo", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,7 +80,7 @@ class ApprovalRequest(BaseModel):
 
 @app.get("/api/health")
 async def health():
-    return {"ok": True}
+    return {"ok": True, "warm": _warm}
 
 
 @app.post("/api/session")
@@ -98,6 +132,8 @@ async def websocket_endpoint(ws: WebSocket, session_id: str):
 
     session.emit = emit
 
+    from policies import ensure_demo_policies, cleanup_demo_policies
+
     try:
         if session.use_demo_policies:
             await emit(
@@ -0,0 +1,96 @@
+"""Pre-fork launcher: warm the backend once, then fork uvicorn workers from it.
+
+Run `python prefork.py` instead of `uvicorn main:app`. The parent imports
+main.py and every lazily-loaded module, binds the listening socket, and
+forks a worker that serves on it. When the worker exits it is replaced by a
+new fork of the already-warm parent instead of a cold interpreter start, and
+connections queue on the shared socket meanwhile. Only one worker runs at a
+time because sessions live in process memory.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+logger = logging.getLogger("demo.prefork")
+
+HOST = os.getenv("PREFORK_HOST", "127.0.0.1")
+PORT = int(os.getenv("PREFORK_PORT", "8000"))
+# Minimum seconds between forks so a crashing worker can't spin the CPU.
+RESPAWN_DELAY_S = 1.0
+
+
+def _bind() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app: object, sock: socket.socket) -> None:
+    config = uvicorn.Config(app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    # Import before forking so every worker starts warm. No threads or event
+    # loops may be running in the parent at fork time.
+    os.environ["WARMUP_ON_START"] = "0"
+    import main as app_module
+
+    elapsed_ms = app_module.warm_imports()
+    logger.info("Parent warmed in %.0fms", elapsed_ms)
+
+    sock = _bind()
+    worker_pid = 0
+    stopping = False
+
+    def _stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+        if worker_pid:
+            os.kill(worker_pid, signum)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping:
+        started = time.monotonic()
+        worker_pid = os.fork()
+        if worker_pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                _serve(app_module.app, sock)
+            except BaseException:
+                logger.exception("Worker crashed")
+                os._exit(1)
+            os._exit(0)
+
+        logger.info("Forked worker %d on %s:%d", worker_pid, HOST, PORT)
+        _, status = os.waitpid(worker_pid, 0)
+        worker_pid = 0
+        if not stopping:
+            logger.warning(
+                "Worker exited with code %d; re-forking",
+                os.waitstatus_to_exitcode(status),
+            )
+            time.sleep(max(0.0, RESPAWN_DELAY_S - (time.monotonic() - started)))
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
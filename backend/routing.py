@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+logger = logging.getLogger("demo.routing")
+
+# "adaptive" picks a model per step; "fixed" always uses the user's choice.
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "adaptive")
+# Cheapest first. The user's selected model is the ceiling.
+MODEL_TIERS = ["claude_haiku", "claude_sonnet", "claude_opus"]
+# Steps that only follow these actions on an unchanged page go to the cheapest tier.
+CHEAP_ACTIONS: set[str] = {
+    "scroll",
+    "extract",
+    "wait",
+    "go_back",
+    "switch_tab",
+    "find_text",
+}
+# Steps to stay escalated after a failure before routing down again.
+ESCALATION_HOLD = 2
+# Anthropic prompt caches are per model, so every switch re-writes the system
+# prompt and tool schema to a cold cache. Outside of failure escalation a tier
+# stays in place for at least this many steps.
+MIN_TIER_STEPS = int(os.getenv("MODEL_MIN_TIER_STEPS", "5"))
+
+
+@dataclass
+class ModelStats:
+    steps: int = 0
+    successes: int = 0
+    total_ms: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "successRate": round(self.successes / self.steps, 3) if self.steps else 0.0,
+            "avgLatencyMs": round(self.total_ms / self.steps) if self.steps else 0,
+        }
+
+
+class ModelRouter:
+    """Chat model proxy that picks a Claude tier per agent step.
+
+    The first step and steps after a failure use stronger models; steps that
+    only scroll/extract on an unchanged page drop to the cheapest tier. Tiers
+    are sticky for MIN_TIER_STEPS to keep each model's prompt cache warm, but a
+    failure escalates immediately, and a call that raises on a cheaper model is
+    retried on the ceiling model. Only the agent's main per-step calls should
+    go through the router (give browser-use a separate page_extraction_llm).
+    Anything not overridden here is delegated to the ceiling model.
+    """
+
+    def __init__(self, models: dict[str, Any], ceiling: str) -> None:
+        self._tiers = MODEL_TIERS[: MODEL_TIERS.index(ceiling) + 1]
+        self._models = {name: models[name] for name in self._tiers}
+        self._tier = len(self._tiers) - 1
+        self._tier_since = 0
+        self._hold_until = 0
+        self._step = 0
+        self._last_url: Optional[str] = None
+        self._step_calls: list[tuple[str, float]] = []
+        self._stats: dict[str, ModelStats] = {}
+
+    @property
+    def ceiling(self) -> Any:
+        return self._models[self._tiers[-1]]
+
+    @property
+    def current_name(self) -> str:
+        return self._tiers[self._tier]
+
+    @property
+    def current(self) -> Any:
+        return self._models[self.current_name]
+
+    @property
+    def model(self) -> str:
+        return self.current.model
+
+    @property
+    def name(self) -> str:
+        return self.current.name
+
+    @property
+    def model_name(self) -> str:
+        return str(self.current.model)
+
+    @property
+    def provider(self) -> str:
+        return self.current.provider
+
+    def __getattr__(self, item: str) -> Any:
+        if item in ("_models", "_tiers"):
+            raise AttributeError(item)
+        return getattr(self.ceiling, item)
+
+    async def ainvoke(self, messages: list[Any], *args: Any, **kwargs: Any) -> Any:
+        name = self.current_name
+        start = time.perf_counter()
+        try:
+            return await self._models[name].ainvoke(messages, *args, **kwargs)
+        except Exception as e:
+            if name == self._tiers[-1]:
+                raise
+            logger.warning("%s call failed (%s); retrying on %s", name, e, self._tiers[-1])
+            name = self._tiers[-1]
+            self._escalate(len(self._tiers) - 1)
+            return await self.ceiling.ainvoke(messages, *args, **kwargs)
+        finally:
+            self._step_calls.append((name, (time.perf_counter() - start) * 1000))
+
+    def models(self) -> list[Any]:
+        return list(self._models.values())
+
+    def observe_step(
+        self,
+        actions: list[str],
+        had_error: bool,
+        url: Optional[str],
+        step_ms: Optional[float] = None,
+    ) -> dict[str, Any]:
+        """Record the finished step and choose the tier for the next one.
+
+        `url` is the page URL after the step ran; `step_ms` is the step's wall
+        time (falls back to the LLM time when not measured).
+        """
+        self._step += 1
+        used = self._step_calls[-1][0] if self._step_calls else self.current_name
+        llm_ms = sum(ms for _, ms in self._step_calls)
+        self._step_calls = []
+        latency_ms = step_ms if step_ms is not None else llm_ms
+
+        stats = self._stats.setdefault(used, ModelStats())
+        stats.steps += 1
+        stats.total_ms += latency_ms
+        if not had_error:
+            stats.successes += 1
+
+        page_changed = url is not None and url != self._last_url
+        self._last_url = url or self._last_url
+
+        top = len(self._tiers) - 1
+        if had_error:
+            self._escalate(min(top, self._tiers.index(used) + 1))
+        elif self._step < self._hold_until:
+            pass
+        elif actions and all(a in CHEAP_ACTIONS for a in actions) and not page_changed:
+            self._switch(0)
+        else:
+            self._switch(min(top, 1))
+
+        return {
+            "step": self._step,
+            "model": str(self._models[used].model),
+            "latencyMs": round(latency_ms),
+            "llmMs": round(llm_ms),
+            "success": not had_error,
+            "nextModel": str(self.current.model),
+            "stats": {
+                str(self._models[n].model): s.as_dict() for n, s in self._stats.items()
+            },
+        }
+
+    def _switch(self, tier: int) -> None:
+        if tier == self._tier or self._step - self._tier_since < MIN_TIER_STEPS:
+            return
+        self._tier = tier
+        self._tier_since = self._step
+
+    def _escalate(self, tier: int) -> None:
+        if tier > self._tier:
+            self._tier = tier
+            self._tier_since = self._step
+        self._hold_until = self._step + ESCALATION_HOLD
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+
+import routing
+from routing import ModelRouter
+
+
+class _Model:
+    provider = "anthropic"
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.name = model
+
+    async def ainvoke(self, messages, *args, **kwargs) -> str:
+        return self.model
+
+
+def _router() -> ModelRouter:
+    models = {name: _Model(name) for name in routing.MODEL_TIERS}
+    return ModelRouter(models, "claude_opus")
+
+
+def _step(router: ModelRouter, actions: list[str], had_error: bool = False, url: str = "a") -> dict:
+    asyncio.run(router.ainvoke([]))
+    return router.observe_step(actions, had_error, url, 100.0)
+
+
+def test_tier_is_sticky_for_min_steps(monkeypatch):
+    monkeypatch.setattr(routing, "MIN_TIER_STEPS", 3)
+    router = _router()
+    nexts = [_step(router, ["scroll"])["nextModel"] for _ in range(4)]
+    assert nexts == ["claude_opus", "claude_opus", "claude_haiku", "claude_haiku"]
+
+
+def test_failure_escalates_immediately(monkeypatch):
+    monkeypatch.setattr(routing, "MIN_TIER_STEPS", 1)
+    router = _router()
+    _step(router, ["scroll"])
+    _step(router, ["scroll"])
+    assert router.current_name == "claude_haiku"
+    assert _step(router, ["click"], had_error=True)["nextModel"] == "claude_sonnet"
+
+
+def test_page_change_is_not_cheap(monkeypatch):
+    monkeypatch.setattr(routing, "MIN_TIER_STEPS", 1)
+    router = _router()
+    _step(router, ["scroll"], url="a")
+    assert _step(router, ["scroll"], url="b")["nextModel"] == "claude_sonnet"
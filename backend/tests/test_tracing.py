@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+
+from tracing import NULL_TRACER, Tracer
+
+
+def _run(coro_fn) -> list[dict]:
+    events: list[dict] = []
+
+    async def emit(event_type: str, data: dict) -> None:
+        events.append(data)
+
+    async def main() -> None:
+        tracer = Tracer(emit)
+        await coro_fn(tracer)
+        await tracer.flush()
+
+    asyncio.run(main())
+    return {s["name"]: s for e in events for s in e["spans"]}
+
+
+def test_concurrent_tasks_keep_their_own_parents():
+    async def scenario(tracer: Tracer) -> None:
+        async def worker(n: int) -> None:
+            with tracer.span(f"w{n}"):
+                await asyncio.sleep(0.01 * n)
+                with tracer.span(f"w{n}.inner"):
+                    await asyncio.sleep(0.01)
+
+        with tracer.span("step"):
+            await asyncio.gather(worker(1), worker(2))
+
+    spans = _run(scenario)
+    assert spans["w1"]["parentId"] == spans["step"]["id"]
+    assert spans["w2"]["parentId"] == spans["step"]["id"]
+    assert spans["w1.inner"]["parentId"] == spans["w1"]["id"]
+    assert spans["w2.inner"]["parentId"] == spans["w2"]["id"]
+
+
+def test_out_of_order_end_leaves_inner_span_open():
+    async def scenario(tracer: Tracer) -> None:
+        outer = tracer.begin("outer")
+        inner = tracer.begin("inner")
+        tracer.end(outer)
+        with tracer.span("child"):
+            pass
+        tracer.end(inner)
+
+    spans = _run(scenario)
+    assert spans["child"]["parentId"] == spans["inner"]["id"]
+
+
+def test_null_tracer_is_a_no_op():
+    with NULL_TRACER.span("x") as span:
+        span.set(a=1)
+    NULL_TRACER.end(NULL_TRACER.begin("y"))
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from validation import CircuitBreaker, ResilientValidator
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _validator(**kwargs) -> ResilientValidator:
+    kwargs.setdefault("default_budget_ms", 200)
+    kwargs.setdefault("action_budgets_ms", {})
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=2, cooldown_s=0))
+    return ResilientValidator(**kwargs)
+
+
+def _open_breaker(validator: ResilientValidator) -> None:
+    for _ in range(validator.breaker.failure_threshold):
+        validator.breaker.record_failure()
+    assert validator.breaker.state == "open"
+
+
+async def _ok() -> str:
+    return "ok"
+
+
+def test_allowed_result_passes_through():
+    validator = _validator()
+    outcome = asyncio.run(validator.validate("click", _ok))
+    assert outcome.result == "ok"
+    assert not outcome.fallback
+    assert not outcome.hedged
+
+
+def test_slow_primary_is_hedged():
+    calls = {"n": 0}
+
+    async def call() -> str:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            await asyncio.sleep(1)
+        return f"attempt-{calls['n']}"
+
+    validator = _validator(default_budget_ms=500)
+    outcome = asyncio.run(validator.validate("click", call))
+    assert outcome.result == "attempt-2"
+    assert outcome.hedged
+    assert validator.metrics()["hedgeWins"] == 1
+
+
+def test_timeouts_open_breaker_and_fall_back_closed():
+    async def hang() -> None:
+        await asyncio.sleep(1)
+
+    validator = _validator(default_budget_ms=20, fail_mode="closed")
+    for _ in range(2):
+        outcome = asyncio.run(validator.validate("click", hang))
+        assert outcome.fallback
+        assert outcome.result.allowed is False
+    assert validator.breaker.state == "open"
+
+
+def test_server_errors_count_as_failures():
+    async def unavailable() -> None:
+        raise _HTTPError(503)
+
+    validator = _validator()
+    for _ in range(2):
+        assert asyncio.run(validator.validate("click", unavailable)).fallback
+    assert validator.breaker.state == "open"
+
+
+def test_client_errors_raise_without_tripping_breaker():
+    calls = {"n": 0}
+
+    async def unauthorized() -> None:
+        calls["n"] += 1
+        raise _HTTPError(401)
+
+    validator = _validator()
+    for _ in range(5):
+        with pytest.raises(_HTTPError):
+            asyncio.run(validator.validate("click", unauthorized))
+    assert validator.breaker.state == "closed"
+    # Rejected requests aren't hedged.
+    assert calls["n"] == 5
+
+
+def test_cancelled_half_open_probe_frees_the_slot():
+    validator = _validator()
+    _open_breaker(validator)
+
+    async def hang() -> None:
+        await asyncio.sleep(10)
+
+    async def cancel_probe() -> None:
+        task = asyncio.ensure_future(validator.validate("click", hang))
+        await asyncio.sleep(0.01)
+        assert validator.breaker.state == "half_open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+
+    outcome = asyncio.run(validator.validate("click", _ok))
+    assert not outcome.fallback
+    assert validator.breaker.state == "closed"
+
+
+def test_rejected_half_open_probe_frees_the_slot():
+    validator = _validator()
+    _open_breaker(validator)
+
+    async def bad_request() -> None:
+        raise _HTTPError(400)
+
+    with pytest.raises(_HTTPError):
+        asyncio.run(validator.validate("click", bad_request))
+    assert not asyncio.run(validator.validate("click", _ok)).fallback
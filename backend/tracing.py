@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Awaitable, Optional
+
+logger = logging.getLogger("demo.tracing")
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+# Profile 1 in N sessions; 0 disables the sampling profiler.
+PROFILE_EVERY = int(os.getenv("PROFILE_EVERY", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/veto-profiles")
+
+EmitFn = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+_session_counter = itertools.count(1)
+
+
+@dataclass
+class Span:
+    id: int
+    parent_id: Optional[int]
+    name: str
+    start: float
+    end: Optional[float] = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+    parent: Optional[Span] = field(default=None, repr=False, compare=False)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+# The innermost open span of the running asyncio task. Tasks copy the context
+# when they are created, so spans opened in browser-use's event-bus/watchdog
+# tasks nest under whatever was open when the task started, and concurrent
+# tasks never see each other's spans.
+_current_span: ContextVar[Optional[Span]] = ContextVar("demo_trace_span", default=None)
+
+
+class _SpanContext:
+    __slots__ = ("_tracer", "_name", "_attrs", "_span")
+
+    def __init__(self, tracer: Tracer, name: str, attrs: dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._attrs = attrs
+        self._span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self._span = self._tracer.begin(self._name, **self._attrs)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._span is not None:
+            if exc_type is not None:
+                self._span.set(error=exc_type.__name__)
+            self._tracer.end(self._span)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer used when tracing is disabled; every call is a no-op."""
+
+    enabled = False
+
+    def span(self, name: str, **attrs: Any) -> _NullSpan:
+        return NULL_SPAN
+
+    def begin(self, name: str, **attrs: Any) -> _NullSpan:
+        return NULL_SPAN
+
+    def end(self, span: Any) -> None:
+        return None
+
+    async def flush(self, **extra: Any) -> None:
+        return None
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """Nested monotonic spans for one session, streamed as `trace` events.
+
+    The parent of a new span is the current span of the calling asyncio task
+    (a context variable), so interleaved tasks keep correct nesting. Finished
+    spans are buffered and sent in one event per `flush()` (once per step) to
+    keep WS chatter low.
+    """
+
+    enabled = True
+
+    def __init__(self, emit: EmitFn) -> None:
+        self._emit = emit
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._finished: list[Span] = []
+
+    def span(self, name: str, **attrs: Any) -> _SpanContext:
+        return _SpanContext(self, name, attrs)
+
+    def begin(self, name: str, **attrs: Any) -> Span:
+        parent = _current_span.get()
+        span = Span(
+            id=next(self._ids),
+            parent_id=parent.id if parent else None,
+            name=name,
+            start=time.perf_counter(),
+            attrs=attrs,
+            parent=parent,
+        )
+        _current_span.set(span)
+        return span
+
+    def end(self, span: Any) -> None:
+        if not isinstance(span, Span) or span.end is not None:
+            return
+        span.end = time.perf_counter()
+        # Only restore the parent if this span is still the task's current
+        # one; ending out of order must not close spans that are still open.
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+        self._finished.append(span)
+
+    async def flush(self, **extra: Any) -> None:
+        if not self._finished:
+            return
+        spans, self._finished = self._finished, []
+        await self._emit(
+            "trace",
+            {**extra, "spans": [self._serialize(s) for s in spans]},
+        )
+
+    def _serialize(self, span: Span) -> dict[str, Any]:
+        end = span.end if span.end is not None else time.perf_counter()
+        return {
+            "id": span.id,
+            "parentId": span.parent_id,
+            "name": span.name,
+            "startMs": round((span.start - self._origin) * 1000, 2),
+            "durationMs": round((end - span.start) * 1000, 2),
+            "attrs": span.attrs,
+        }
+
+
+def create_tracer(emit: EmitFn) -> Tracer | NullTracer:
+    return Tracer(emit) if TRACE_ENABLED else NULL_TRACER
+
+
+def trace_method(obj: Any, method: str, tracer: Tracer, span_name: str) -> None:
+    """Wrap an async method on a single instance in a span.
+
+    Uses object.__setattr__ so it also works on pydantic models, which reject
+    assignment of non-field attributes.
+    """
+    original = getattr(obj, method, None)
+    if original is None:
+        return
+
+    async def traced(*args: Any, **kwargs: Any) -> Any:
+        with tracer.span(span_name):
+            return await original(*args, **kwargs)
+
+    object.__setattr__(obj, method, traced)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack and writes folded stacks on stop.
+
+    The output (`<session>.folded`) is the collapsed-stack format consumed by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, session_id: str, interval_ms: float = PROFILE_INTERVAL_MS) -> None:
+        self.session_id = session_id
+        self._interval = interval_ms / 1000
+        self._target = threading.get_ident()
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{session_id[:8]}", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            names: list[str] = []
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get("__name__", "?")
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self._stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> Optional[Path]:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        if not self._stacks:
+            return None
+        out_dir = Path(PROFILE_DIR)
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            path = out_dir / f"{self.session_id}.folded"
+            with path.open("w") as f:
+                for stack, count in self._stacks.items():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Failed to write profile for %s: %s", self.session_id, e)
+            return None
+        logger.info("Wrote profile for session %s to %s", self.session_id, path)
+        return path
+
+
+def maybe_start_profiler(session_id: str) -> Optional[SamplingProfiler]:
+    """Start a profiler for every PROFILE_EVERY-th session, else return None."""
+    if PROFILE_EVERY <= 0 or next(_session_counter) % PROFILE_EVERY:
+        return None
+    profiler = SamplingProfiler(session_id)
+    profiler.start()
+    return profiler
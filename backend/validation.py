@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Literal, Optional
+
+logger = logging.getLogger("demo.validation")
+
+# What to do when Veto can't answer in time: "open" allows the action,
+# "closed" denies it (which routes it to the human reviewer).
+VETO_FAIL_MODE = os.getenv("VETO_FAIL_MODE", "closed")
+VETO_BUDGET_MS = float(os.getenv("VETO_BUDGET_MS", "3000"))
+# Per-action overrides, e.g. "click=8000,navigate=2000". LLM-mode policies
+# (click in the demo set) are slower than deterministic ones.
+VETO_ACTION_BUDGETS_MS = os.getenv("VETO_ACTION_BUDGETS_MS", "click=8000")
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 10
+HEDGE_MIN_DELAY_MS = 50.0
+LATENCY_WINDOW = 100
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("VETO_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.getenv("VETO_BREAKER_COOLDOWN_S", "30"))
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True for errors that say the Veto backend is unhealthy rather than
+    that the request itself was rejected (bad API key, invalid call, 4xx).
+
+    Only these count towards the circuit breaker or trigger an early hedge.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    # Transport errors from HTTP clients that don't subclass the builtins
+    # (e.g. httpx.ConnectError, httpx.ReadTimeout, aiohttp.ClientConnectionError).
+    name = type(error).__name__
+    return any(tag in name for tag in ("Timeout", "Connect", "Transport", "Network"))
+
+
+def _parse_budgets(spec: str) -> dict[str, float]:
+    budgets: dict[str, float] = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            budgets[name.strip()] = float(value)
+        except ValueError:
+            logger.warning("Ignoring invalid Veto budget entry: %r", item)
+    return budgets
+
+
+@dataclass
+class LocalValidationResult:
+    reason: Optional[str]
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LocalDecision:
+    """Stand-in for a Veto validation result when the backend is unavailable."""
+
+    allowed: bool
+    validation_result: LocalValidationResult
+
+
+@dataclass
+class ValidationOutcome:
+    result: Any
+    hedged: bool = False
+    fallback: bool = False
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        cooldown_s: float = BREAKER_COOLDOWN_S,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state: BreakerState = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown_s:
+                return False
+            self._transition("half_open")
+        # Half-open: let a single probe through.
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot without judging backend health."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != "open":
+                self._transition("open")
+
+    def _transition(self, state: BreakerState) -> None:
+        logger.warning("Veto circuit breaker %s -> %s", self.state, state)
+        self.state = state
+
+
+class ResilientValidator:
+    """Deadline, hedging and circuit-breaker wrapper around a Veto validate call.
+
+    Each call gets a per-action latency budget. If the first request hasn't
+    answered by the action's recent p95 (or fails early), a second identical
+    request is hedged and whichever succeeds first wins. When the budget runs
+    out or the breaker is open, a local fail-open/fail-closed decision is
+    returned instead of stalling the agent. Errors that aren't transient
+    (see `is_transient_error`) are re-raised and don't touch the breaker.
+    """
+
+    def __init__(
+        self,
+        fail_mode: str = VETO_FAIL_MODE,
+        default_budget_ms: float = VETO_BUDGET_MS,
+        action_budgets_ms: Optional[dict[str, float]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        is_transient: Callable[[BaseException], bool] = is_transient_error,
+    ) -> None:
+        self.fail_open = fail_mode == "open"
+        self.is_transient = is_transient
+        self.default_budget_ms = default_budget_ms
+        self.action_budgets_ms = (
+            action_budgets_ms
+            if action_budgets_ms is not None
+            else _parse_budgets(VETO_ACTION_BUDGETS_MS)
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies: dict[str, deque[float]] = {}
+        self._counts = {
+            "requests": 0,
+            "hedges": 0,
+            "hedgeWins": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "fallbacks": 0,
+        }
+
+    def budget_ms(self, action: str) -> float:
+        return self.action_budgets_ms.get(action, self.default_budget_ms)
+
+    def hedge_delay_ms(self, action: str) -> float:
+        budget = self.budget_ms(action)
+        window = self._latencies.get(action)
+        if not window or len(window) < HEDGE_MIN_SAMPLES:
+            return budget / 2
+        ordered = sorted(window)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE))]
+        return min(max(p95, HEDGE_MIN_DELAY_MS), budget)
+
+    def metrics(self) -> dict[str, Any]:
+        requests = self._counts["requests"]
+        return {
+            **self._counts,
+            "breaker": self.breaker.state,
+            "hedgeRate": round(self._counts["hedges"] / requests, 3) if requests else 0.0,
+        }
+
+    async def validate(
+        self, action: str, call: Callable[[], Awaitable[Any]]
+    ) -> ValidationOutcome:
+        self._counts["requests"] += 1
+        if not self.breaker.allow_request():
+            return self._fallback("circuit open")
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.budget_ms(action) / 1000
+        hedge_at = start + self.hedge_delay_ms(action) / 1000
+
+        async def attempt(index: int) -> tuple[Any, int, float]:
+            t0 = loop.time()
+            result = await call()
+            return result, index, (loop.time() - t0) * 1000
+
+        pending = {asyncio.ensure_future(attempt(0))}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                timeout = deadline - now
+                if not hedged:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Retrieve every finished task's exception before returning, so
+                # a failed attempt that finished alongside the winner isn't
+                # reported as "never retrieved".
+                winner: Optional[tuple[Any, int, float]] = None
+                rejected: Optional[BaseException] = None
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        winner = winner or task.result()
+                        continue
+                    self._counts["errors"] += 1
+                    if not self.is_transient(error):
+                        rejected = rejected or error
+                        continue
+                    last_error = error
+                    logger.warning("Veto validation attempt for %s failed: %s", action, error)
+                if winner is None and rejected is not None:
+                    # The backend answered; the request itself is bad. Surface
+                    # it to the caller instead of hedging or tripping the breaker.
+                    self.breaker.release_probe()
+                    raise rejected
+                if winner is not None:
+                    result, index, latency_ms = winner
+                    self._record_latency(action, latency_ms)
+                    if index > 0:
+                        self._counts["hedgeWins"] += 1
+                    self.breaker.record_success()
+                    return ValidationOutcome(result=result, hedged=hedged)
+                # Hedge when the p95 timer fires, or right away if the primary failed.
+                if not hedged and loop.time() < deadline and (not done or not pending):
+                    hedged = True
+                    self._counts["hedges"] += 1
+                    pending.add(asyncio.ensure_future(attempt(1)))
+        except asyncio.CancelledError:
+            # The session was stopped or its WebSocket dropped. That says
+            # nothing about backend health, but a half-open probe slot left
+            # marked in flight would reject every later request.
+            self.breaker.release_probe()
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.breaker.record_failure()
+        if last_error is None or pending:
+            self._counts["timeouts"] += 1
+            reason = f"no answer within {self.budget_ms(action):.0f}ms"
+        else:
+            reason = str(last_error)
+        outcome = self._fallback(reason)
+        outcome.hedged = hedged
+        return outcome
+
+    def _record_latency(self, action: str, latency_ms: float) -> None:
+        window = self._latencies.setdefault(action, deque(maxlen=LATENCY_WINDOW))
+        window.append(latency_ms)
+
+    def _fallback(self, why: str) -> ValidationOutcome:
+        self._counts["fallbacks"] += 1
+        mode = "open" if self.fail_open else "closed"
+        return ValidationOutcome(
+            result=LocalDecision(
+                allowed=self.fail_open,
+                validation_result=LocalValidationResult(
+                    reason=f"Veto unavailable ({why}); failing {mode}",
+                    metadata={"mode": "fallback"},
+                ),
+            ),
+            fallback=True,
+        )